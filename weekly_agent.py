@@ -7,14 +7,24 @@ import ssl
 import json
 import smtplib
 import logging
+import functools
 import datetime as dt
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree, html as lxml_html
+from html import escape, unescape
 from urllib.parse import urljoin, unquote
 
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+try:
+    import orjson  # opcional: (de)serialización en C del fichero de estado
+except ImportError:
+    orjson = None
+
 # ---------------------------------------------------------------------
 # Configuración
 # ---------------------------------------------------------------------
@@ -34,6 +44,7 @@ class Config:
     dry_run = os.getenv("DRY_RUN", "0") == "1"
     log_level = os.getenv("LOG_LEVEL", "INFO")
     state_file = ".weekly_agent_state.json"
+    probe_workers = 4  # artículos CDTR consultados en paralelo
 
 
 # ---------------------------------------------------------------------
@@ -45,179 +56,41 @@ MESES_ES = {
     7: "julio", 8: "agosto", 9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
 }
 
+# Semana y año en títulos/URLs de CDTR (p.ej. "...-week-37" / "2025")
+_WEEK_RE = re.compile(r"\bweek[\s\-]?(\d{1,2})\b")
+_YEAR_RE = re.compile(r"\b(20\d{2})\b")
+
+# Enlace al PDF dentro de la página del artículo (compilado una sola vez)
+_PDF_HREF_RE = re.compile(r"\.pdf$", re.I | re.ASCII)
+
+# href de artículos CDTR buscados directamente sobre los bytes del listado (sin DOM):
+# solo el atributo href suelto (no data-href), con comillas o sin ellas; ruta
+# /publications-data/ o /publications-and-data/ y slug del CDTR en una sola pasada
+_CDTR_HREF_RE = re.compile(
+    rb"""(?<![\w-])href\s*=\s*(["']?)([^"'\s>]*/publications-(?:and-)?data/[^"'\s>]*"""
+    rb"""communicable-disease-threats-report[^"'\s>]*)\1""",
+    re.I,
+)
+
+@functools.lru_cache(maxsize=32)
+def _week_year_from_text(text: str):
+    s = unquote(text).lower()
+    w = _WEEK_RE.search(s)
+    # Con varios años en el slug (cambio de año) vale el último
+    years = _YEAR_RE.findall(s)
+    return (int(w.group(1)) if w else None,
+            int(years[-1]) if years else None)
+
 def fecha_es(dt_utc: dt.datetime) -> str:
     return f"{dt_utc.day} de {MESES_ES.get(dt_utc.month, 'mes')} de {dt_utc.year} (UTC)"
 
 
 # ---------------------------------------------------------------------
-# Agente
+# Plantillas
 # ---------------------------------------------------------------------
 
-class WeeklyReportAgent:
-    def __init__(self, config: Config):
-        self.config = config
-        logging.basicConfig(
-            level=getattr(logging, self.config.log_level.upper(), logging.INFO),
-            format="%(asctime)s %(levelname)s %(message)s"
-        )
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-                          "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/pdf,*/*;q=0.8",
-        })
-
-    # ------------------ Localización PDF ------------------
-
-    def _parse_week_year(self, text: str):
-        s = unquote(text or "").lower()
-        w = re.search(r"\bweek[\s\-]?(\d{1,2})\b", s)
-        y = re.search(r"\b(20\d{2})\b", s)
-        return (int(w.group(1)) if w else None,
-                int(y.group(1)) if y else None)
-
-    def fetch_latest_pdf(self):
-        r = self.session.get(self.config.list_url, timeout=30)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-
-        candidates = []
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            l = href.lower()
-            if "communicable-disease-threats-report" in l and ("/publications-data/" in l or "/publications-and-data/" in l):
-                url = href if href.startswith("http") else urljoin("https://www.ecdc.europa.eu", href)
-                candidates.append(url)
-
-        seen, ordered = set(), []
-        for u in candidates:
-            if u not in seen:
-                ordered.append(u)
-                seen.add(u)
-
-        if not ordered:
-            raise RuntimeError("No se encontraron artículos CDTR.")
-
-        for article_url in ordered:
-            ar = self.session.get(article_url, timeout=30)
-            if ar.status_code != 200:
-                continue
-            asoup = BeautifulSoup(ar.text, "html.parser")
-            pdf_a = asoup.find("a", href=re.compile(r"\.pdf$", re.I))
-            if not pdf_a:
-                continue
-            pdf_url = pdf_a["href"]
-            if not pdf_url.startswith("http"):
-                pdf_url = urljoin(article_url, pdf_url)
-            t = (asoup.title.get_text(strip=True) if asoup.title else "") + " " + pdf_url
-            week, year = self._parse_week_year(t)
-            logging.info("PDF más reciente: %s (semana=%s, año=%s)", pdf_url, week, year)
-            return pdf_url, article_url, week, year
-
-        raise RuntimeError("No se encontró PDF en los artículos candidatos.")
-
-    # ------------------ Estado (anti-duplicados) ------------------
-
-    def _load_last_state(self):
-        if not os.path.exists(self.config.state_file):
-            return {}
-        try:
-            with open(self.config.state_file, "r") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-
-    def _save_last_state(self, pdf_url):
-        state = {"last_pdf_url": pdf_url, "timestamp": dt.datetime.utcnow().isoformat()}
-        with open(self.config.state_file, "w") as f:
-            json.dump(state, f)
-
-    # ------------------ HTML email-safe (sin imágenes, con “círculos” CSS) ------------------
-
-    def build_email_safe_html(self, pdf_url: str, article_url: str, week, year) -> str:
-        period_label = f"Semana {week} · {year}" if week and year else "Último informe ECDC"
-
-        def circle(color):
-            return (f"<span style='display:inline-block;width:12px;height:12px;border-radius:50%;"
-                    f"background:{color};vertical-align:middle;margin-right:6px'></span>")
-
-        def card(color, chip_text, title_text, body_html, border_color, bg_color):
-            return (
-                "<table role='presentation' width='100%' cellspacing='0' cellpadding='0' "
-                f"style='margin:12px 0;border-left:6px solid {border_color};background:{bg_color};"
-                "border-radius:10px'>"
-                "<tr><td style='padding:12px 14px'>"
-                "<table role='presentation' cellspacing='0' cellpadding='0' width='100%'>"
-                "<tr>"
-                "<td valign='top' width='20' style='padding-right:8px'>"
-                f"{circle(color)}"
-                "</td>"
-                "<td>"
-                f"<div style='font-size:12px;font-weight:700;letter-spacing:.3px;color:{border_color};text-transform:uppercase;margin-bottom:4px'>{chip_text}</div>"
-                f"<div style='font-size:16px;font-weight:800;color:#0b5cab;margin-bottom:4px'>{title_text}</div>"
-                f"<div style='font-size:14px;color:#333;opacity:.95'>{body_html}</div>"
-                "</td></tr></table>"
-                "</td></tr></table>"
-            )
-
-        html = (
-            "<html><body style='margin:0;padding:0;background:#f5f7fb;font-family:Arial,Helvetica,sans-serif;color:#222;'>"
-            "<table role='presentation' width='100%' cellspacing='0' cellpadding='0' style='padding:20px 12px;background:#f5f7fb;'>"
-            "<tr><td align='center'>"
-            "<table role='presentation' width='760' cellspacing='0' cellpadding='0' style='max-width:760px;background:#ffffff;border-radius:12px;overflow:hidden;box-shadow:0 4px 14px rgba(0,0,0,.06)'>"
-            "<tr><td style='background:#0b5cab;color:#fff;padding:18px 22px'>"
-            "<div style='font-size:22px;font-weight:800'>Boletín semanal de amenazas infecciosas</div>"
-            f"<div style='opacity:.95;font-size:13px;margin-top:2px'>{period_label}</div>"
-            "</td></tr>"
-            "<tr><td style='padding:0 18px'>"
-        )
-
-        html += card("#2e7d32", "Virus del Nilo Occidental",
-                     "652 casos humanos y 38 muertes en Europa (acumulado a 3-sep)",
-                     "Italia concentra la mayoría de casos;&nbsp;"
-                     "<span style='background:#fff7d6;padding:2px 4px;border-radius:4px;border-left:4px solid #ff9800'>🇪🇸 España: 5 casos humanos y 3 brotes en équidos/aves</span>.",
-                     "#2e7d32", "#f0f7f2")
-
-        html += card("#d32f2f", "Fiebre Crimea-Congo (CCHF)",
-                     "Sin nuevos casos esta semana",
-                     "<span style='background:#fff7d6;padding:2px 4px;border-radius:4px;border-left:4px solid #ff9800'>🇪🇸 España: 3 casos en 2025</span>; Grecia 2 casos.",
-                     "#d32f2f", "#fbf1f1")
-
-        html += card("#1565c0", "Respiratorios",
-                     "COVID-19 al alza en detección; Influenza y VRS en niveles bajos",
-                     "<span style='background:#fff7d6;padding:2px 4px;border-radius:4px;border-left:4px solid #ff9800'>🇪🇸 España</span>: descenso de positividad SARI por SARS-CoV-2.",
-                     "#1565c0", "#eef4fb")
-
-        html += (
-            "</td></tr>"
-            "<tr><td style='padding:6px 18px 4px'>"
-            "<div style='font-weight:800;color:#333;margin:10px 0 8px'>Puntos clave</div>"
-            "<table role='presentation' width='100%' cellspacing='0' cellpadding='0'>"
-            "<tr><td style='border-left:6px solid #2e7d32;padding:6px 10px;font-size:14px'>"
-            f"{circle('#2e7d32')}Expansión estacional en 9 países; mortalidad global ~6%."
-            "</td></tr>"
-            "<tr><td style='border-left:6px solid #ef6c00;padding:6px 10px;font-size:14px'>"
-            f"{circle('#ef6c00')}Dengue autóctono en Francia/Italia/Portugal; sin casos en España."
-            "</td></tr>"
-            "<tr><td style='border-left:6px solid #1565c0;padding:6px 10px;font-size:14px'>"
-            f"{circle('#1565c0')}A(H9N2) esporádico en Asia; riesgo UE/EEE: muy bajo."
-            "</td></tr>"
-            "</table>"
-            "</td></tr>"
-            "<tr><td align='center' style='padding:8px 18px 20px'>"
-            f"<a href='{article_url or pdf_url}' style='display:inline-block;background:#0b5cab;color:#fff;text-decoration:none;padding:10px 18px;border-radius:8px;font-weight:700'>Abrir informe completo (PDF)</a>"
-            "</td></tr>"
-            "<tr><td style='background:#f3f4f6;color:#6b7280;padding:12px 20px;font-size:12px;text-align:center'>"
-            f"Generado automáticamente · Fuente: ECDC (CDTR{' semana '+str(week) if week else ''}) · Fecha (UTC): {dt.datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
-            "</td></tr>"
-            "</table></td></tr></table></body></html>"
-        )
-        return html
-
-    # ------------------ HTML enriquecido (adjunto) - NUEVO FORMATO ------------------
-
-    def build_rich_html_attachment(self, week_label: str, gen_date_es: str) -> str:
-        html = f"""<!DOCTYPE html>
+# Adjunto enriquecido: se define una sola vez; solo se interpolan {week_label} y {gen_date_es}
+_RICH_HTML_TEMPLATE = """<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
@@ -533,7 +406,234 @@ class WeeklyReportAgent:
 </body>
 </html>
 """
-        return html
+
+
+# ---------------------------------------------------------------------
+# Agente
+# ---------------------------------------------------------------------
+
+class WeeklyReportAgent:
+    def __init__(self, config: Config):
+        self.config = config
+        logging.basicConfig(
+            level=getattr(logging, self.config.log_level.upper(), logging.INFO),
+            format="%(asctime)s %(levelname)s %(message)s"
+        )
+        self.session = requests.Session()
+        self._listing_validators = {}
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                          "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+            "Accept": "text/html,application/xhtml+xml,application/pdf,*/*;q=0.8",
+        })
+        # Un pool por host (ecdc.europa.eu) con sitio para los probes en paralelo:
+        # la conexión TLS del listado se reutiliza en los artículos (keep-alive).
+        # Los errores transitorios (5xx, 429, resets) se reintentan con backoff.
+        retry = Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=["HEAD", "GET"])
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=8, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    # ------------------ Localización PDF ------------------
+
+    def _parse_week_year(self, text: str):
+        return _week_year_from_text(text or "")
+
+    def _probe_article(self, article_url: str):
+        try:
+            ar = self.session.get(article_url, timeout=30)
+        except requests.RequestException as e:
+            logging.warning("No se pudo abrir %s: %s", article_url, e)
+            return None
+        if ar.status_code != 200 or not ar.content:
+            return None
+        # lxml (libxml2) parsea los bytes y detecta la codificación en C
+        try:
+            doc = lxml_html.fromstring(ar.content)
+        except etree.LxmlError as e:
+            logging.warning("No se pudo parsear %s: %s", article_url, e)
+            return None
+        pdf_url = next((h for h in doc.xpath("//a/@href") if _PDF_HREF_RE.search(h)), None)
+        if not pdf_url:
+            return None
+        if not pdf_url.startswith("http"):
+            pdf_url = urljoin(article_url, pdf_url)
+        t = doc.xpath("string(//title)").strip() + " " + pdf_url
+        week, year = self._parse_week_year(t)
+        return pdf_url, article_url, week, year
+
+    def fetch_latest_pdf(self, state=None):
+        # GET condicional: si el listado no cambió desde el último envío, el
+        # servidor responde 304 sin cuerpo y no hay nada nuevo que procesar.
+        state = state or {}
+        headers = {}
+        if state.get("last_pdf_url"):
+            if state.get("listing_etag"):
+                headers["If-None-Match"] = state["listing_etag"]
+            if state.get("listing_last_modified"):
+                headers["If-Modified-Since"] = state["listing_last_modified"]
+
+        r = self.session.get(self.config.list_url, headers=headers, timeout=30)
+        if r.status_code == 304:
+            logging.info("Listado ECDC sin cambios (304).")
+            return None
+        r.raise_for_status()
+        self._listing_validators = {
+            "listing_etag": r.headers.get("ETag"),
+            "listing_last_modified": r.headers.get("Last-Modified"),
+        }
+        # (año, semana, url) deducidos del slug del artículo, sin tráfico de red
+        seen, candidates = set(), []
+        for m in _CDTR_HREF_RE.finditer(r.content):
+            href = unescape(m.group(2).decode("utf-8", "replace"))
+            url = href if href.startswith("http") else urljoin("https://www.ecdc.europa.eu", href)
+            if url in seen:
+                continue
+            seen.add(url)
+            week, year = self._parse_week_year(url)
+            candidates.append((year or 0, week or 0, url))
+
+        # Más reciente primero; los que no tienen semana/año conservan el orden de la página
+        candidates.sort(key=lambda c: (c[0], c[1]), reverse=True)
+        ordered = [url for _, _, url in candidates]
+
+        if not ordered:
+            raise RuntimeError("No se encontraron artículos CDTR.")
+
+        # Lo habitual es que el artículo más reciente ya enlace el PDF: una sola petición
+        found = self._probe_article(ordered[0])
+        if not found and len(ordered) > 1:
+            # Si no, el resto en paralelo (ex.map respeta el orden); al encontrarlo no se
+            # espera a los probes en curso, se cancelan los pendientes y se sigue
+            ex = ThreadPoolExecutor(max_workers=self.config.probe_workers)
+            try:
+                found = next((f for f in ex.map(self._probe_article, ordered[1:]) if f), None)
+            finally:
+                ex.shutdown(wait=False, cancel_futures=True)
+        if found:
+            pdf_url, article_url, week, year = found
+            logging.info("PDF más reciente: %s (semana=%s, año=%s)", pdf_url, week, year)
+            return found
+
+        raise RuntimeError("No se encontró PDF en los artículos candidatos.")
+
+    # ------------------ Estado (anti-duplicados) ------------------
+
+    def _load_last_state(self):
+        if not os.path.exists(self.config.state_file):
+            return {}
+        try:
+            with open(self.config.state_file, "rb") as f:
+                raw = f.read()
+            return orjson.loads(raw) if orjson else json.loads(raw)
+        except Exception:
+            return {}
+
+    def _save_last_state(self, pdf_url, week=None, year=None):
+        # last_year/last_week: semana/año del informe CDTR enviado (no del día del envío)
+        state = {"last_pdf_url": pdf_url, "timestamp": dt.datetime.utcnow().isoformat(),
+                 "last_year": year, "last_week": week}
+        state.update(self._listing_validators)
+        data = orjson.dumps(state) if orjson else json.dumps(state).encode("utf-8")
+        # Escritura atómica y en disco (fsync) antes del replace; si falla, no queda el .tmp
+        tmp_path = self.config.state_file + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config.state_file)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # ------------------ HTML email-safe (sin imágenes, con “círculos” CSS) ------------------
+
+    def build_email_safe_html(self, pdf_url: str, article_url: str, week, year) -> str:
+        period_label = f"Semana {week} · {year}" if week and year else "Último informe ECDC"
+
+        def circle(color):
+            return (f"<span style='display:inline-block;width:12px;height:12px;border-radius:50%;"
+                    f"background:{color};vertical-align:middle;margin-right:6px'></span>")
+
+        def card(color, chip_text, title_text, body_html, border_color, bg_color):
+            return (
+                "<table role='presentation' width='100%' cellspacing='0' cellpadding='0' "
+                f"style='margin:12px 0;border-left:6px solid {border_color};background:{bg_color};"
+                "border-radius:10px'>"
+                "<tr><td style='padding:12px 14px'>"
+                "<table role='presentation' cellspacing='0' cellpadding='0' width='100%'>"
+                "<tr>"
+                "<td valign='top' width='20' style='padding-right:8px'>"
+                f"{circle(color)}"
+                "</td>"
+                "<td>"
+                f"<div style='font-size:12px;font-weight:700;letter-spacing:.3px;color:{border_color};text-transform:uppercase;margin-bottom:4px'>{chip_text}</div>"
+                f"<div style='font-size:16px;font-weight:800;color:#0b5cab;margin-bottom:4px'>{title_text}</div>"
+                f"<div style='font-size:14px;color:#333;opacity:.95'>{body_html}</div>"
+                "</td></tr></table>"
+                "</td></tr></table>"
+            )
+
+        parts = [
+            "<html><body style='margin:0;padding:0;background:#f5f7fb;font-family:Arial,Helvetica,sans-serif;color:#222;'>"
+            "<table role='presentation' width='100%' cellspacing='0' cellpadding='0' style='padding:20px 12px;background:#f5f7fb;'>"
+            "<tr><td align='center'>"
+            "<table role='presentation' width='760' cellspacing='0' cellpadding='0' style='max-width:760px;background:#ffffff;border-radius:12px;overflow:hidden;box-shadow:0 4px 14px rgba(0,0,0,.06)'>"
+            "<tr><td style='background:#0b5cab;color:#fff;padding:18px 22px'>"
+            "<div style='font-size:22px;font-weight:800'>Boletín semanal de amenazas infecciosas</div>"
+            f"<div style='opacity:.95;font-size:13px;margin-top:2px'>{period_label}</div>"
+            "</td></tr>"
+            "<tr><td style='padding:0 18px'>",
+
+            card("#2e7d32", "Virus del Nilo Occidental",
+                 "652 casos humanos y 38 muertes en Europa (acumulado a 3-sep)",
+                 "Italia concentra la mayoría de casos;&nbsp;"
+                 "<span style='background:#fff7d6;padding:2px 4px;border-radius:4px;border-left:4px solid #ff9800'>🇪🇸 España: 5 casos humanos y 3 brotes en équidos/aves</span>.",
+                 "#2e7d32", "#f0f7f2"),
+
+            card("#d32f2f", "Fiebre Crimea-Congo (CCHF)",
+                 "Sin nuevos casos esta semana",
+                 "<span style='background:#fff7d6;padding:2px 4px;border-radius:4px;border-left:4px solid #ff9800'>🇪🇸 España: 3 casos en 2025</span>; Grecia 2 casos.",
+                 "#d32f2f", "#fbf1f1"),
+
+            card("#1565c0", "Respiratorios",
+                 "COVID-19 al alza en detección; Influenza y VRS en niveles bajos",
+                 "<span style='background:#fff7d6;padding:2px 4px;border-radius:4px;border-left:4px solid #ff9800'>🇪🇸 España</span>: descenso de positividad SARI por SARS-CoV-2.",
+                 "#1565c0", "#eef4fb"),
+
+            "</td></tr>"
+            "<tr><td style='padding:6px 18px 4px'>"
+            "<div style='font-weight:800;color:#333;margin:10px 0 8px'>Puntos clave</div>"
+            "<table role='presentation' width='100%' cellspacing='0' cellpadding='0'>"
+            "<tr><td style='border-left:6px solid #2e7d32;padding:6px 10px;font-size:14px'>"
+            f"{circle('#2e7d32')}Expansión estacional en 9 países; mortalidad global ~6%."
+            "</td></tr>"
+            "<tr><td style='border-left:6px solid #ef6c00;padding:6px 10px;font-size:14px'>"
+            f"{circle('#ef6c00')}Dengue autóctono en Francia/Italia/Portugal; sin casos en España."
+            "</td></tr>"
+            "<tr><td style='border-left:6px solid #1565c0;padding:6px 10px;font-size:14px'>"
+            f"{circle('#1565c0')}A(H9N2) esporádico en Asia; riesgo UE/EEE: muy bajo."
+            "</td></tr>"
+            "</table>"
+            "</td></tr>"
+            "<tr><td align='center' style='padding:8px 18px 20px'>"
+            f"<a href='{escape(article_url or pdf_url)}' style='display:inline-block;background:#0b5cab;color:#fff;text-decoration:none;padding:10px 18px;border-radius:8px;font-weight:700'>Abrir informe completo (PDF)</a>"
+            "</td></tr>"
+            "<tr><td style='background:#f3f4f6;color:#6b7280;padding:12px 20px;font-size:12px;text-align:center'>"
+            f"Generado automáticamente · Fuente: ECDC (CDTR{' semana '+str(week) if week else ''}) · Fecha (UTC): {dt.datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
+            "</td></tr>"
+            "</table></td></tr></table></body></html>",
+        ]
+        return "".join(parts)
+
+    # ------------------ HTML enriquecido (adjunto) - NUEVO FORMATO ------------------
+
+    def build_rich_html_attachment(self, week_label: str, gen_date_es: str) -> str:
+        return _RICH_HTML_TEMPLATE.format(week_label=escape(week_label), gen_date_es=escape(gen_date_es))
 
     # ------------------ Envío email (multipart/alternative + adjunto) ------------------
 
@@ -599,14 +699,24 @@ class WeeklyReportAgent:
     # ------------------ Run ------------------
 
     def run(self):
+        state = self._load_last_state()
+
+        # El informe de la semana ISO actual ya se envió: ni siquiera se consulta el listado
+        iso_year, iso_week, _ = dt.datetime.utcnow().isocalendar()
+        if state.get("last_year") == iso_year and state.get("last_week") == iso_week:
+            logging.info("Informe de la semana %d/%d ya enviado, no se consulta el ECDC.", iso_week, iso_year)
+            return
+
         try:
-            pdf_url, article_url, week, year = self.fetch_latest_pdf()
+            latest = self.fetch_latest_pdf(state)
         except Exception as e:
             logging.exception("No se pudo localizar el PDF más reciente: %s", e)
             return
+        if latest is None:
+            return
+        pdf_url, article_url, week, year = latest
 
         # Anti-duplicados
-        state = self._load_last_state()
         if state.get("last_pdf_url") == pdf_url:
             logging.info("El PDF ya fue enviado previamente, no se reenvía.")
             return
@@ -635,7 +745,7 @@ class WeeklyReportAgent:
                 attachment_html=rich_html,
                 attachment_name="resumen_ecdc.html"
             )
-            self._save_last_state(pdf_url)
+            self._save_last_state(pdf_url, week, year)
         except Exception as e:
             logging.exception("Error enviando el correo: %s", e)
 